@@ -2,18 +2,30 @@
 # 📦 Imports
 # ----------------------------------------------
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
+import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
-import seaborn as sns
+import plotly
 import plotly.express as px
+import plotly.io as pio
 from wordcloud import WordCloud 
 import time
 import io
+import threading
 import os
 import json
+import hashlib
+import hmac
+import pickle
+import secrets
+import sys
+import tempfile
 import pandas as pd
 import datetime
 from streamlit_plotly_events import plotly_events
+from streamlit_autorefresh import st_autorefresh
 
 
 # 🔄 Load existing notes if available
@@ -121,15 +133,298 @@ with col2:
 # 🧾 Load & Clean Data
 # ----------------------------------------------
 
-df = pd.read_csv("Cleaned_Intern_Performance_Data.csv", parse_dates=["Date of Assignment", "Date of Completion"])
+DATA_CSV = "Cleaned_Intern_Performance_Data.csv"
+INCOMING_DIR = "incoming"  # drop new batches here as *.csv (write elsewhere, then move in)
+DATE_COLS = ["Date of Assignment", "Date of Completion"]
+AGG_COLS = ['Task_Completion_Days', 'Project_Quality_Score', 'Mentor_Feedback_Score']
+
+
+PROBE_BYTES = 4096  # head/tail of the consumed bytes, re-checked to spot a rewritten file
+QUARANTINE_CSV = "quarantined_rows.csv"  # malformed appended lines end up here
+
+
+def read_rows(buffer):
+    # Raises ValueError on unparseable dates/scores so a bad batch never reaches the aggregates
+    rows = pd.read_csv(buffer)
+    missing = [col for col in DATE_COLS + AGG_COLS + ["Month", "Department", "Completion_Status"] if col not in rows.columns]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    for col in DATE_COLS:
+        rows[col] = pd.to_datetime(rows[col])
+    for col in AGG_COLS:
+        rows[col] = pd.to_numeric(rows[col])
+    return rows
+
+
+def read_appended(header, data):
+    """Parse appended lines; malformed ones are returned separately instead of failing the chunk."""
+    try:
+        return read_rows(io.BytesIO(header + data)), []
+    except (ValueError, TypeError, KeyError):
+        pass
+    good, bad = [], []
+    for line in data.splitlines(keepends=True):
+        if not line.strip():
+            continue
+        try:
+            good.append(read_rows(io.BytesIO(header + line)))
+        except (ValueError, TypeError, KeyError):
+            bad.append(line)
+    return (pd.concat(good, ignore_index=True) if good else pd.DataFrame()), bad
+
+
+def quarantine_lines(header, lines):
+    new_file = not os.path.exists(QUARANTINE_CSV)
+    with open(QUARANTINE_CSV, "ab") as f:
+        f.write((header if new_file else b"") + b"".join(lines))
+
+
+def aggregate_rows(rows):
+    # Sums & counts per Month/Department, so deltas can simply be added on. Missing
+    # keys go under "Unknown", same as the sketches and scores, so all count the same rows
+    grouped = rows.fillna({"Month": "Unknown", "Department": "Unknown"}).groupby(["Month", "Department"])[AGG_COLS]
+    return pd.concat({"sum": grouped.sum(), "count": grouped.count()}, axis=1)
+
+
+# Fixed-bin histogram sketches: (low, high, bin width) per column. Counts per
+# Month/Department cell are mergeable by addition, so any Month/Department
+# combination gets histograms & approximate quantiles without rescanning rows.
+SKETCH_BINS = {
+    'Task_Completion_Days': (0.0, 60.0, 0.5),
+    'Project_Quality_Score': (0.0, 10.0, 0.1),
+    'Mentor_Feedback_Score': (0.0, 5.0, 0.1),
+}
+
+
+def sketch_centers(col):
+    low, high, width = SKETCH_BINS[col]
+    return low + width * np.arange(int(round((high - low) / width)) + 1)
+
+
+def sketch_bin_index(values, col):
+    low, _, width = SKETCH_BINS[col]
+    return np.clip(np.round((values - low) / width).astype(int), 0, len(sketch_centers(col)) - 1)
+
+
+def histogram_counts(values, col):
+    # Same bins as the sketches, for views that have to be computed from rows
+    values = values[~np.isnan(values)]
+    centers = sketch_centers(col)
+    return pd.Series(np.bincount(sketch_bin_index(values, col), minlength=len(centers)), index=centers)
+
+
+def sketch_rows(rows):
+    sketches = {}
+    for col in SKETCH_BINS:
+        centers = sketch_centers(col)
+        n_bins = len(centers)
+        values = rows[col].to_numpy(dtype=float)
+        keep = ~np.isnan(values)
+        bins = sketch_bin_index(values[keep], col)
+        codes, cells = pd.MultiIndex.from_arrays([
+            rows["Month"].fillna("Unknown")[keep], rows["Department"].fillna("Unknown")[keep],
+        ]).factorize()
+        counts = np.bincount(codes * n_bins + bins, minlength=len(cells) * n_bins).reshape(len(cells), n_bins)
+        sketches[col] = pd.DataFrame(counts, index=cells.set_names(["Month", "Department"]), columns=centers)
+    return sketches
+
+
+def merge_sketch(sketches, col, months=None, depts=None):
+    sketch = sketches[col]
+    mask = np.ones(len(sketch), dtype=bool)
+    if months is not None:
+        mask &= sketch.index.get_level_values("Month").isin(months)
+    if depts is not None:
+        mask &= sketch.index.get_level_values("Department").isin(depts)
+    return sketch[mask].sum()
+
+
+def sketch_quantiles(counts, col, qs):
+    """Approximate quantiles from merged bin counts (uniform within each bin)."""
+    low, high, width = SKETCH_BINS[col]
+    counts = counts.to_numpy(dtype=float)
+    cum = np.cumsum(counts)
+    if not len(cum) or cum[-1] == 0:
+        return [np.nan] * len(qs)
+    targets = np.clip(np.asarray(qs) * cum[-1], 1e-9, cum[-1])
+    idx = np.searchsorted(cum, targets, "left")
+    before = np.where(idx > 0, cum[idx - 1], 0)
+    # Clamp: interpolating inside the first/last bin could step past the column's hard bounds
+    return list(np.clip(low + width * (idx - 0.5 + (targets - before) / counts[idx]), low, high))
+
+
+def apply_delta(state, rows):
+    if rows.empty:
+        return
+    # Everything is computed before anything is assigned, so a failing batch leaves state untouched
+    start = state["n_rows"]
+    rows.index = pd.RangeIndex(start, start + len(rows))
+    delta = sketch_rows(rows)
+    updates = {
+        "pending": state["pending"] + [rows],  # concatenated lazily by current_frame()
+        "n_rows": start + len(rows),
+        "dept_counts": state["dept_counts"].add(rows["Department"].fillna("Unknown").value_counts(), fill_value=0).astype(int).sort_values(ascending=False),
+        "status_counts": state["status_counts"].add(rows["Completion_Status"].value_counts(), fill_value=0).astype(int).sort_values(ascending=False),
+        "agg": state["agg"].add(aggregate_rows(rows), fill_value=0),
+        "sketches": {col: state["sketches"][col].add(delta[col], fill_value=0).astype(int) for col in SKETCH_BINS},
+    }
+    state.update(updates)
+    state["version"] += 1
+
+
+def current_frame(state):
+    # One concat per read for however many deltas arrived since the last one
+    if state["pending"]:
+        state["df"] = pd.concat([state["df"], *state["pending"]])
+        state["pending"] = []
+    return state["df"]
+
+
+def probe_file(f, offset):
+    # Hash of the first & last PROBE_BYTES we consumed; changes if those bytes were rewritten
+    f.seek(0)
+    head = f.read(min(offset, PROBE_BYTES))
+    f.seek(max(offset - PROBE_BYTES, 0))
+    tail = f.read(min(offset, PROBE_BYTES))
+    return hashlib.sha256(head + tail).hexdigest()
+
+
+def remember_file(state, f):
+    stat = os.fstat(f.fileno())
+    state["ino"] = stat.st_ino
+    state["mtime_ns"] = stat.st_mtime_ns
+    state["probe"] = probe_file(f, state["offset"])
+
+
+def load_full(state):
+    with open(DATA_CSV, "rb") as f:
+        raw = f.read()
+        end = raw.rfind(b"\n") + 1  # only complete lines, a writer may be mid-row
+        rows = read_rows(io.BytesIO(raw[:end]))
+        state.update({
+            "header": raw[:raw.find(b"\n") + 1],
+            "offset": end,
+            "df": rows,
+            "pending": [],
+            "n_rows": len(rows),
+            "hasher": hashlib.sha256(raw[:end]),
+            "dept_counts": rows["Department"].fillna("Unknown").value_counts(),
+            "status_counts": rows["Completion_Status"].value_counts(),
+            "agg": aggregate_rows(rows),
+            "sketches": sketch_rows(rows),
+            "seen_batches": set(),
+        })
+        remember_file(state, f)
+    state["content_hash"] = state["hasher"].hexdigest()
+    state["version"] += 1
+
+
+def was_rewritten(state, f):
+    # Known blind spot: an in-place rewrite that keeps the inode, grows the file and only
+    # changes bytes between the probed head and tail (same byte lengths) is taken for an
+    # append. Catching that would mean re-hashing the whole file every run; writers should
+    # write a temp file and rename it over DATA_CSV (new inode) when replacing the data.
+    stat = os.fstat(f.fileno())
+    if stat.st_ino != state["ino"] or stat.st_size < state["offset"]:
+        return True
+    if stat.st_size == state["offset"] and stat.st_mtime_ns != state["mtime_ns"]:
+        return True  # touched without growing
+    return probe_file(f, state["offset"]) != state["probe"]
+
+
+def ingest_new_rows(state):
+    """Tail-follow the cleaned CSV and the drop directory, applying new rows as deltas.
+
+    Malformed appended lines are moved to QUARANTINE_CSV and skipped (the file is
+    append-only, they will never get fixed in place). Batches that fail to parse are
+    left unconsumed and retried, since they can be corrected. Returns warnings to show.
+    """
+    problems = []
+    with open(DATA_CSV, "rb") as f:
+        rewritten = was_rewritten(state, f)
+        if not rewritten:
+            f.seek(state["offset"])
+            chunk = f.read()
+            end = chunk.rfind(b"\n") + 1
+            if end:
+                rows, bad_lines = read_appended(state["header"], chunk[:end])
+                try:
+                    apply_delta(state, rows)
+                except (ValueError, TypeError, KeyError):
+                    bad_lines = chunk[:end].splitlines(keepends=True)
+                if bad_lines:
+                    try:
+                        quarantine_lines(state["header"], bad_lines)
+                        where = QUARANTINE_CSV
+                    except OSError:
+                        where = "nowhere (quarantine file not writable)"
+                    problems.append(f"Skipped {len(bad_lines)} malformed row(s) appended to {DATA_CSV}, moved to {where}")
+                state["offset"] += end
+                state["hasher"].update(chunk[:end])
+                # Same handle the chunk came from, so a file swapped in meanwhile is still detected
+                remember_file(state, f)
+    if rewritten:
+        # File was replaced (e.g. notebook rerun) -> start over
+        try:
+            load_full(state)
+        except (ValueError, TypeError, KeyError) as e:
+            problems.append(f"Could not reload rewritten {DATA_CSV}: {e}")
+
+    if os.path.isdir(INCOMING_DIR):
+        for name in sorted(os.listdir(INCOMING_DIR)):
+            if name.endswith(".csv") and name not in state["seen_batches"]:
+                with open(os.path.join(INCOMING_DIR, name), "rb") as f:
+                    batch = f.read()
+                try:
+                    apply_delta(state, read_rows(io.BytesIO(batch)))
+                except (ValueError, TypeError, KeyError) as e:
+                    problems.append(f"Skipped batch {name} (will retry): {e}")
+                    continue
+                state["seen_batches"].add(name)
+                state["hasher"].update(name.encode() + b"\0" + batch)
+
+    state["content_hash"] = state["hasher"].hexdigest()
+    return problems
+
+
+@st.cache_resource
+def get_live_dataset():
+    # Shared across sessions & reruns; every rerun only reads what is new
+    state = {"lock": threading.Lock(), "version": 0}
+    load_full(state)
+    return state
+
+
+def summarize(agg, level):
+    totals = agg.groupby(level=level).sum()
+    return (totals["sum"] / totals["count"]).reset_index()
+
+
+live = get_live_dataset()
+with live["lock"]:
+    ingest_problems = ingest_new_rows(live)
+    df = current_frame(live)  # shared between sessions: never modify it in place
+    live_agg = live["agg"]
+    live_sketches = live["sketches"]
+    data_hash = live["content_hash"]
+    dept_counts = live["dept_counts"].to_dict()
+    status_counts = live["status_counts"].to_dict()
 
 # ----------------------------------------------
 # 🔍 Sidebar Filters (with Tooltips)
 # ----------------------------------------------
+for problem in ingest_problems:
+    st.warning(f"⚠️ {problem}")
+
 st.sidebar.header("🧰 Filter Data")
-# Count interns per department/status dynamically
-dept_counts = df["Department"].value_counts().to_dict()
-status_counts = df["Completion_Status"].value_counts().to_dict()
+
+# Counts in the labels change as rows arrive, so re-label the current selection
+for key, counts in [("multiselect_1", dept_counts), ("multiselect_2", status_counts)]:
+    if key in st.session_state:
+        names = [x.split(" (")[0] for x in st.session_state[key]]
+        relabeled = [f"{name} ({counts[name]})" for name in names if name in counts]
+        if relabeled != st.session_state[key]:
+            st.session_state[key] = relabeled
 
 selected_depts = st.sidebar.multiselect(
     "🏢 Department",
@@ -162,6 +457,22 @@ theme = st.sidebar.radio(
     key="radio_1"
 )
 
+live_mode = st.sidebar.checkbox(
+    "🔴 Live Updates", value=False,
+    key="checkbox_live",
+    help="Pick up rows appended to the dataset (or dropped into the incoming/ folder) without reloading"
+)
+refresh_secs = st.sidebar.slider(
+    "⏱️ Refresh Every (sec)", 2, 60, 10,
+    key="slider_live",
+    disabled=not live_mode
+)
+
+# Browser-side timer triggers the rerun, so the script itself never blocks
+refresh_count = st_autorefresh(interval=refresh_secs * 1000, key="autorefresh_live") if live_mode else 0
+auto_refreshed = live_mode and refresh_count != st.session_state.get("last_refresh_count", 0)
+st.session_state["last_refresh_count"] = refresh_count
+
 # 🎨 Apply Dark/Light mode styling
 if theme == "Dark":
     st.markdown("""
@@ -209,10 +520,15 @@ else:
 
 
 # Calculate min and max dates for date filter (move this earlier!)
-df["Date of Assignment"] = pd.to_datetime(df["Date of Assignment"])
 min_date = df["Date of Assignment"].min()
 max_date = df["Date of Assignment"].max()
 
+# Keep the end date following the newest rows while it sits on the previous maximum
+if "date_input_2" in st.session_state and "live_max_date" in st.session_state:
+    if pd.Timestamp(st.session_state["date_input_2"]) == st.session_state["live_max_date"] != max_date:
+        st.session_state["date_input_2"] = max_date.date()
+st.session_state["live_max_date"] = max_date
+
 
 # 🔄 Reset Filters Button
 if st.sidebar.button("🔁 Reset All Filters"):
@@ -237,11 +553,81 @@ if st.sidebar.button("🔁 Reset All Filters"):
 # df = df[(df["Department"].isin(selected_depts)) & (df["Completion_Status"].isin(selected_status))]
 # df = df[(df["Project_Quality_Score"] >= quality_range[0]) & (df["Project_Quality_Score"] <= quality_range[1])]
 
+# ----------------------------------------------
+# 🧮 Composite Performance Score
+# ----------------------------------------------
+STATUS_POINTS = {"Completed": 1.0, "Ongoing": 0.5, "Dropped": 0.0}
+INTERACTION_POINTS = {"High": 1.0, "Medium": 0.5, "Low": 0.0}
+DEFAULT_WEIGHTS = {"Quality": 0.35, "Feedback": 0.25, "Speed": 0.15, "Status": 0.15, "Interaction": 0.10}
+DEFAULT_OUTLIER_Z = 1.75  # scores are bounded & bimodal, so |z| rarely passes 2
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def compute_scores(_df, content_hash, weights, outlier_z=DEFAULT_OUTLIER_Z):
+    """Weighted composite score plus per-department percentile, z-score & outlier flag.
+
+    Everything is done in one vectorized NumPy pass over the full dataset; the
+    result is cached per dataset content hash + weights (``_df`` itself is not hashed).
+    """
+    columns = ["Composite_Score", "Dept_Percentile", "Dept_Z_Score", "Outlier"]
+    if _df.empty:
+        return pd.DataFrame(columns=columns, index=_df.index)
+    weights = dict(weights)
+    days = _df["Task_Completion_Days"].to_numpy(dtype=float)
+    finished = days[~np.isnan(days)]
+    lo, hi = (finished.min(), finished.max()) if finished.size else (0.0, 0.0)
+    parts = np.vstack([
+        _df["Project_Quality_Score"].to_numpy(dtype=float) / 10,
+        (_df["Mentor_Feedback_Score"].to_numpy(dtype=float) - 1) / 4,
+        1 - (days - lo) / max(hi - lo, 1e-9),  # faster = better, unfinished tasks get no credit
+        _df["Completion_Status"].map(STATUS_POINTS).to_numpy(dtype=float),
+        _df["Interaction_Level"].map(INTERACTION_POINTS).to_numpy(dtype=float),
+    ])
+    w = np.array([weights[name] for name in DEFAULT_WEIGHTS])
+    # Live rows aren't range-checked, so keep every part in [0, 1]
+    score = 100 * (w @ np.clip(np.nan_to_num(parts), 0, 1)) / (w.sum() or 1)
+
+    # Per-department stats via group codes + bincount (no Python loop over groups)
+    codes, _ = pd.factorize(_df["Department"].fillna("Unknown"))
+    counts = np.bincount(codes)
+    mean = np.bincount(codes, score) / counts
+    std = np.sqrt(np.maximum(np.bincount(codes, score ** 2) / counts - mean ** 2, 0))
+    z = (score - mean[codes]) / np.where(std > 0, std, 1)[codes]
+
+    # Tie-aware (mid-rank) percentile: one lexsort by (department, score), then runs of equal pairs
+    order = np.lexsort((score, codes))
+    sorted_codes, sorted_score = codes[order], score[order]
+    new_run = np.r_[True, (sorted_codes[1:] != sorted_codes[:-1]) | (sorted_score[1:] != sorted_score[:-1])]
+    run_id = np.cumsum(new_run) - 1
+    run_start = np.flatnonzero(new_run)
+    run_len = np.diff(np.r_[run_start, len(score)])
+    group_start = np.searchsorted(sorted_codes, sorted_codes, "left")
+    percentile = np.empty_like(score)
+    percentile[order] = 100 * (run_start[run_id] - group_start + 0.5 * run_len[run_id]) / counts[sorted_codes]
+
+    return pd.DataFrame(dict(zip(columns, [score, percentile, z, np.abs(z) >= outlier_z])), index=_df.index)
+
+
+with st.sidebar.expander("⚖️ Composite Score Weights"):
+    score_weights = tuple(
+        (name, st.slider(name, 0.0, 1.0, default, 0.05, key=f"slider_weight_{name.lower()}"))
+        for name, default in DEFAULT_WEIGHTS.items()
+    )
+    outlier_z = st.slider(
+        "Outlier |z| threshold", 1.0, 3.0, DEFAULT_OUTLIER_Z, 0.05,
+        key="slider_outlier_z",
+        help="Flag interns whose composite score is this many std devs from their department mean"
+    )
+
+# Scored on the full dataset so ranks don't shift with the date filter
+df = df.join(compute_scores(df, data_hash, score_weights, outlier_z))
+
 # ----------------------------------------------
 # 🔄 Spinner
 # ----------------------------------------------
-with st.spinner("🔄 Processing data..."):
-    time.sleep(1)
+if not auto_refreshed:
+    with st.spinner("🔄 Processing data..."):
+        time.sleep(1)
 
 # ----------------------------------------------
 # 📆 Date Range Filter & Search Box
@@ -282,18 +668,164 @@ search_term = st.text_input(
 #     df = df[df["Intern Name"].str.contains(search_term, case=False) | df["Intern ID"].astype(str).str.contains(search_term)]
 
 # ----------------------------------------------
-# 🧮 Monthly Summary Aggregation
+# 💾 Persistent Result Cache
 # ----------------------------------------------
-monthly_summary = df.groupby("Month").agg({
-    'Task_Completion_Days': 'mean',
-    'Project_Quality_Score': 'mean',
-    'Mentor_Feedback_Score': 'mean'
-}).reset_index()
+RESULT_CACHE_DIR = ".result_cache"
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+with open(__file__, "rb") as f:
+    # Library versions too: pickles from an older pandas/plotly/matplotlib may not load
+    CODE_VERSION = hashlib.sha256(f.read() + " ".join([
+        sys.version, pd.__version__, np.__version__, matplotlib.__version__, plotly.__version__, st.__version__,
+    ]).encode()).hexdigest()
+
+
+@st.cache_resource
+def result_cache_secret():
+    """HMAC key for cache entries: $RESULT_CACHE_SECRET, else a random key kept (0600) in the cache dir."""
+    try:
+        os.makedirs(RESULT_CACHE_DIR, mode=0o700, exist_ok=True)
+        os.chmod(RESULT_CACHE_DIR, 0o700)
+    except OSError:
+        pass
+    if os.environ.get("RESULT_CACHE_SECRET"):
+        return os.environ["RESULT_CACHE_SECRET"].encode()
+    key_path = os.path.join(RESULT_CACHE_DIR, ".key")
+    if not os.path.exists(key_path):
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix=".tmp")  # created 0600
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(secrets.token_bytes(32))
+            os.link(tmp_path, key_path)  # atomic, and loses cleanly if another worker won
+        except OSError:
+            pass
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    try:
+        with open(key_path, "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None  # no usable key -> caching disabled
+
+
+def evict_result_cache():
+    # Least recently used first (reads touch the file's mtime)
+    entries = []
+    for entry in os.scandir(RESULT_CACHE_DIR):
+        if entry.name.endswith(".pkl"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def disk_cached(name, view_state, build):
+    """Return ``build()``, served from disk when the same data, view and code were seen before.
+
+    Keyed by dataset content hash + normalized view state + code/library version, so
+    it survives restarts and is shared by every worker. Writes are atomic and each
+    entry is HMAC-signed, so nothing another user dropped in the directory gets unpickled.
+    """
+    secret = result_cache_secret()
+    if secret is None:
+        return build()
+    payload = json.dumps({"name": name, "data": data_hash, "code": CODE_VERSION, "view": view_state}, sort_keys=True, default=str)
+    path = os.path.join(RESULT_CACHE_DIR, hashlib.sha256(payload.encode()).hexdigest() + ".pkl")
+    try:
+        with open(path, "rb") as f:
+            blob = f.read()
+    except OSError:
+        blob = None
+    if blob is not None:
+        # Entries are HMAC-signed; only unpickle what this app wrote itself
+        signature, body = blob[:32], blob[32:]
+        try:
+            if not hmac.compare_digest(signature, hmac.new(secret, body, hashlib.sha256).digest()):
+                raise ValueError("bad signature")
+            result = pickle.loads(body)
+        except Exception:
+            # Tampered, truncated or unloadable entry -> treat as a miss and drop it
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        else:
+            try:
+                os.utime(path)
+            except OSError:
+                pass  # read-only cache dir: still a hit, just no LRU bump
+            return result
+
+    result = build()
+    tmp_path = None
+    try:
+        body = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(hmac.new(secret, body, hashlib.sha256).digest() + body)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, path)
+        evict_result_cache()
+    except OSError:
+        # Cache is best effort: a read-only or full disk just means no caching
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return result
+
+
+def fig_to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+# Normalized view state: an invalid or out-of-range date selection collapses to what is actually shown
+full_range = pd.to_datetime(start_date) <= min_date and pd.to_datetime(end_date) >= max_date
+if start_date > end_date or full_range:
+    view_state = {"start": None, "end": None}
+else:
+    view_state = {
+        "start": max(pd.Timestamp(start_date), min_date).date().isoformat(),
+        "end": min(pd.Timestamp(end_date), max_date).date().isoformat(),
+    }
+# Views showing composite scores also depend on the weights
+scored_view_state = {**view_state, "weights": [[name, round(w, 4)] for name, w in score_weights], "outlier_z": round(outlier_z, 4)}
 
+# ----------------------------------------------
+# 🧮 Monthly Summary Aggregation
+# ----------------------------------------------
 month_order = ['January', 'February', 'March', 'April', 'May', 'June',
                'July', 'August', 'September', 'October', 'November', 'December']
-monthly_summary['Month'] = pd.Categorical(monthly_summary['Month'], categories=month_order, ordered=True)
-monthly_summary = monthly_summary.sort_values('Month')
+
+
+def build_summaries():
+    if full_range:
+        # Unfiltered view -> reuse the incrementally maintained aggregates
+        monthly_summary = summarize(live_agg, "Month")
+        dept_summary = summarize(live_agg, "Department").set_index("Department")
+    else:
+        monthly_summary = df.groupby("Month").agg({
+            'Task_Completion_Days': 'mean',
+            'Project_Quality_Score': 'mean',
+            'Mentor_Feedback_Score': 'mean'
+        }).reset_index()
+        dept_summary = df.groupby("Department")[AGG_COLS].mean()
+
+    monthly_summary['Month'] = pd.Categorical(monthly_summary['Month'], categories=month_order, ordered=True)
+    return monthly_summary.sort_values('Month'), dept_summary
+
+
+monthly_summary, dept_summary = disk_cached("summaries", view_state, build_summaries)
 
 # ----------------------------------------------
 # ✨ Styling Functions
@@ -319,7 +851,10 @@ def style_main_df(df):
         .format({
             'Task_Completion_Days': '{:.1f}',
             'Project_Quality_Score': '{:.1f}',
-            'Mentor_Feedback_Score': '{:.1f}'
+            'Mentor_Feedback_Score': '{:.1f}',
+            'Composite_Score': '{:.1f}',
+            'Dept_Percentile': '{:.1f}',
+            'Dept_Z_Score': '{:.2f}'
         })
 
 # ----------------------------------------------
@@ -380,22 +915,22 @@ with tab1:
 
 
     st.subheader("📌 Quality Score by Department")
-    fig = px.bar(
+    fig_json = disk_cached("quality_by_department", view_state, lambda: px.bar(
     df,
     x='Department',
     y='Project_Quality_Score',
     color='Department',
     title='Quality by Department',
-    hover_data=['Intern Name', 'Project_Quality_Score'])
-    st.plotly_chart(fig, use_container_width=True)
+    hover_data=['Intern Name', 'Project_Quality_Score']).to_json())
+    st.plotly_chart(pio.from_json(fig_json), use_container_width=True)
 
     st.subheader("📊 Task Duration by Assignment Date")
-    fig = px.bar(df, x="Date of Assignment", y="Task_Completion_Days", title="Task Completion Duration per Assignment", color="Department")
-    st.plotly_chart(fig, use_container_width=True)
+    fig_json = disk_cached("duration_by_date", view_state, lambda: px.bar(df, x="Date of Assignment", y="Task_Completion_Days", title="Task Completion Duration per Assignment", color="Department").to_json())
+    st.plotly_chart(pio.from_json(fig_json), use_container_width=True)
 
-    st.subheader("🏆 Top 5 Interns by Project Quality Score")
-    top_interns = df.sort_values(by='Project_Quality_Score', ascending=False).head(5)
-    st.table(top_interns[['Intern Name', 'Project_Quality_Score']])
+    st.subheader("🏆 Top 5 Interns by Composite Score")
+    top_interns = df.sort_values(by='Composite_Score', ascending=False).head(5)
+    st.table(top_interns[['Intern Name', 'Department', 'Composite_Score', 'Dept_Percentile', 'Project_Quality_Score']].round(1))
 
     # Simulate textual feedback from numerical score
     def map_score_to_feedback(score):
@@ -463,13 +998,16 @@ with tab2:
     st.subheader("📅 Monthly Summary")
     st.markdown("### 📈 Average Metrics by Month")
 
-    fig, ax = plt.subplots(figsize=(10, 5))
-    monthly_summary.set_index('Month')[['Task_Completion_Days', 'Project_Quality_Score', 'Mentor_Feedback_Score']].plot(kind='bar', ax=ax)
-    plt.ylabel("Average Score")
-    plt.title("Monthly Averages")
-    plt.xticks(rotation=45)
-    plt.grid(axis='y')
-    st.pyplot(fig)
+    def monthly_chart():
+        fig, ax = plt.subplots(figsize=(10, 5))
+        monthly_summary.set_index('Month')[['Task_Completion_Days', 'Project_Quality_Score', 'Mentor_Feedback_Score']].plot(kind='bar', ax=ax)
+        plt.ylabel("Average Score")
+        plt.title("Monthly Averages")
+        plt.xticks(rotation=45)
+        plt.grid(axis='y')
+        return fig_to_png(fig)
+
+    st.image(disk_cached("monthly_chart", view_state, monthly_chart), use_column_width=True)
 
     def highlight_low_feedback(val): return 'background-color: red' if val < 3 else ''
     def highlight_low_quality(val): return 'background-color: orange' if val < 6 else ''
@@ -494,40 +1032,85 @@ with tab2:
     st.dataframe(styled_summary, use_container_width=True)
     
     st.subheader("⏳ Task Completion Time Distribution")
-    fig1, ax1 = plt.subplots()
-    sns.histplot(df['Task_Completion_Days'].dropna(), bins=30, ax=ax1, color='skyblue')
-    st.pyplot(fig1)
+    def completion_histogram():
+        fig1, ax1 = plt.subplots()
+        if full_range:
+            # Merge the per Month/Department sketches instead of rescanning every row
+            days_hist = merge_sketch(live_sketches, 'Task_Completion_Days')
+        else:
+            days_hist = histogram_counts(df['Task_Completion_Days'].to_numpy(dtype=float), 'Task_Completion_Days')
+        days_hist = days_hist[days_hist > 0]
+        ax1.bar(days_hist.index, days_hist.values, width=SKETCH_BINS['Task_Completion_Days'][2], color='skyblue', edgecolor='white')
+        ax1.set_xlabel('Task_Completion_Days')
+        ax1.set_ylabel('Count')
+        return fig_to_png(fig1)
+
+    st.image(disk_cached("completion_histogram", view_state, completion_histogram), use_column_width=True)
+
+    st.subheader("📐 Approximate Percentiles (Month / Department)")
+    sketch_cells = live_sketches['Task_Completion_Days'].index
+    # Default to the months the sidebar date range touches; the key changes with the
+    # range so the selection follows it
+    range_months = [] if full_range else [m for m in month_order if m in set(df["Month"])]
+    pct_col1, pct_col2 = st.columns(2)
+    with pct_col1:
+        pct_months = st.multiselect(
+            "📆 Months", [m for m in month_order if m in sketch_cells.get_level_values("Month")],
+            default=range_months,
+            key=f"multiselect_3_{view_state['start']}_{view_state['end']}",
+            help="Leave empty for all months"
+        )
+    with pct_col2:
+        pct_depts = st.multiselect(
+            "🏢 Departments", sorted(sketch_cells.get_level_values("Department").unique()),
+            key="multiselect_4", help="Leave empty for all departments"
+        )
+
+    percentile_rows = []
+    for col in SKETCH_BINS:
+        counts = merge_sketch(live_sketches, col, pct_months or None, pct_depts or None)
+        p50, p90, p99 = sketch_quantiles(counts, col, [0.5, 0.9, 0.99])
+        percentile_rows.append({"Metric": col, "Count": int(counts.sum()), "Median": p50, "P90": p90, "P99": p99})
+    st.table(pd.DataFrame(percentile_rows).set_index("Metric").round(2))
+    st.caption("Estimated from fixed-bin histograms kept per Month/Department — values are accurate to half a bin. "
+               "Whole months are used, so a date range that starts or ends mid-month includes the full month.")
+
+    def department_chart(col, color):
+        fig, ax = plt.subplots()
+        dept_summary[col].plot(kind='barh', ax=ax, color=color)
+        return fig_to_png(fig)
 
     st.subheader("📋 Avg Project Quality by Department")
-    fig2, ax2 = plt.subplots()
-    df.groupby("Department")["Project_Quality_Score"].mean().plot(kind='barh', ax=ax2, color='mediumseagreen')
-    st.pyplot(fig2)
+    st.image(disk_cached("dept_quality_chart", view_state, lambda: department_chart("Project_Quality_Score", 'mediumseagreen')), use_column_width=True)
 
     st.subheader("💬 Avg Mentor Feedback by Department")
-    fig3, ax3 = plt.subplots()
-    df.groupby("Department")["Mentor_Feedback_Score"].mean().plot(kind='barh', ax=ax3, color='salmon')
-    st.pyplot(fig3)
+    st.image(disk_cached("dept_feedback_chart", view_state, lambda: department_chart("Mentor_Feedback_Score", 'salmon')), use_column_width=True)
 
 # ----------------------------------------------
 # 📁 Tab 3: Full Intern Data
 # ----------------------------------------------
 with tab3:
     st.subheader("📁 Full Intern Data")
-    styled_full = style_main_df(df)
-    st.dataframe(styled_full, use_container_width=True)
-
-    # Export HTML
-    html_buffer = io.StringIO()
-    styled_full.to_html(buf=html_buffer)
-    html_content = html_buffer.getvalue()
-    with open("styled_table.html", "w", encoding="utf-8") as f:
-        f.write(html_content)
-
-    # Export Excel
-    excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='Intern Data')
-    excel_data = excel_buffer.getvalue()
+
+    def build_exports():
+        # Export HTML (also what the table below displays, so styling only runs on a cache miss)
+        html_buffer = io.StringIO()
+        style_main_df(df).to_html(buf=html_buffer)
+        html_content = html_buffer.getvalue()
+
+        # Export Excel
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False, sheet_name='Intern Data')
+        return html_content, excel_buffer.getvalue()
+
+    html_content, excel_data = disk_cached("styled_exports", scored_view_state, build_exports)
+    components.html(html_content, height=600, scrolling=True)
+    html_hash = hashlib.sha256(html_content.encode()).hexdigest()
+    if st.session_state.get("styled_table_hash") != html_hash or not os.path.exists("styled_table.html"):
+        with open("styled_table.html", "w", encoding="utf-8") as f:
+            f.write(html_content)
+        st.session_state["styled_table_hash"] = html_hash
 
     st.markdown("### 📤 Export Styled Data")
     st.download_button("⬇️ Download Styled Table (HTML)", data=html_content, file_name="styled_table.html", mime="text/html")
@@ -547,13 +1130,15 @@ with tab4:
     selected_intern = st.selectbox("🔍 Choose Intern", df['Intern Name'].unique(), key='selectbox_2')
     data = df[df['Intern Name'] == selected_intern]
     st.write("📊 Average Scores:")
-    st.dataframe(data[['Task_Completion_Days', 'Project_Quality_Score', 'Mentor_Feedback_Score']].mean().round(2))
+    st.dataframe(data[['Task_Completion_Days', 'Project_Quality_Score', 'Mentor_Feedback_Score', 'Composite_Score', 'Dept_Percentile', 'Dept_Z_Score']].mean().round(2))
+    if data['Outlier'].any():
+        st.warning("⚠️ Composite score is an outlier within this intern's department.")
 
     # 🏆 Top Performing Interns Leaderboard
     st.subheader("🏅 Intern Leaderboard with Avatars")
 
     top_n = 5
-    top_interns = df.sort_values("Project_Quality_Score", ascending=False).head(top_n).reset_index(drop=True)
+    top_interns = df.sort_values("Composite_Score", ascending=False).head(top_n).reset_index(drop=True)
 
     # Add avatars
     import random
@@ -591,7 +1176,7 @@ with tab4:
                 <img src='{row["Avatar"]}' style='width: 36px; height: 36px; border-radius: 50%; margin-right: 12px;'>
                 <div>
                     <strong style="font-size: 15px;">{row['Rank']} - {row['Intern Name']}</strong><br>
-                    <span>Dept: {row['Department']} | ⭐ {row['Project_Quality_Score']}</span>
+                    <span>Dept: {row['Department']} | ⭐ {row['Composite_Score']:.1f} | Top {100 - row['Dept_Percentile']:.0f}% in dept</span>
                 </div>
             </div>
         """, unsafe_allow_html=True)
@@ -600,7 +1185,7 @@ with tab4:
 
 
     st.markdown("### 🗒️ Summary Table")
-    st.table(top_interns[["Rank", "Intern ID", "Intern Name", "Department", "Project_Quality_Score"]])
+    st.table(top_interns[["Rank", "Intern ID", "Intern Name", "Department", "Composite_Score", "Dept_Percentile", "Project_Quality_Score"]].round(1))
     
     st.markdown("### 🕒 Timeline Summary (Sample)")
     st.markdown("""
@@ -712,9 +1297,12 @@ with tab5:
     # 📦 Download All as ZIP
     st.markdown("### 📦 Download All Snapshots")
     zip_filename = "all_snapshots.zip"
-    with zipfile.ZipFile(zip_filename, "w") as zipf:
-        for i in range(1, 9):
-            zipf.write(f"img/JN{i}.jpg", arcname=f"JN{i}.jpg")
+    snapshot_paths = [f"img/JN{i}.jpg" for i in range(1, 9)]
+    # Only rebuild when a snapshot changed
+    if not os.path.exists(zip_filename) or os.path.getmtime(zip_filename) < max(map(os.path.getmtime, snapshot_paths)):
+        with zipfile.ZipFile(zip_filename, "w") as zipf:
+            for path in snapshot_paths:
+                zipf.write(path, arcname=os.path.basename(path))
 
     with open(zip_filename, "rb") as zip_file:
         st.download_button(